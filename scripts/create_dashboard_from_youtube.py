@@ -11,12 +11,14 @@ This script:
 
 Usage:
     python create_dashboard_from_youtube.py <youtube_url>
+    python create_dashboard_from_youtube.py <youtube_url> <youtube_url> ...   # batch
 """
 
 import os
 import sys
 import json
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import requests
@@ -37,7 +39,11 @@ except ImportError as e:
 
 
 class DashboardCreator:
-    def __init__(self):
+    def __init__(self, parallel_analysis=False):
+        # Run the relevance and specificity scripts at the same time. Each loads its own
+        # transformer model, so this roughly doubles peak RAM/GPU memory: opt-in only.
+        self.parallel_analysis = parallel_analysis
+        
         # Load environment variables
         self.load_env()
         
@@ -184,7 +190,9 @@ class DashboardCreator:
         # Primary method: yt-dlp downloading best audio format directly (no ffmpeg needed)
         try:
             import subprocess
-            output_file = self.temp_dir / f"audio_{int(time.time())}.m4a"
+            # Video id in the name keeps concurrent downloads (batch mode) apart
+            video_id = self.extract_video_id(youtube_url) or "yt"
+            output_file = self.temp_dir / f"audio_{video_id}_{int(time.time())}.m4a"
             
             print("  → Using yt-dlp (downloading audio-only format)...")
             result = subprocess.run([
@@ -220,7 +228,8 @@ class DashboardCreator:
             if not audio_stream:
                 raise Exception("No audio stream found")
                 
-            output_file = self.temp_dir / f"audio_{int(time.time())}.mp4"
+            video_id = self.extract_video_id(youtube_url) or "yt"
+            output_file = self.temp_dir / f"audio_{video_id}_{int(time.time())}.mp4"
             audio_stream.download(output_path=str(self.temp_dir), filename=output_file.name)
             
             print(f"✅ Audio downloaded via pytube: {output_file}")
@@ -230,13 +239,19 @@ class DashboardCreator:
             print(f"❌ pytube also failed: {e}")
             return None
             
+    def submit_transcription(self, audio_file):
+        """Start an AssemblyAI transcription without blocking; returns a Future[Transcript]"""
+        return aai.Transcriber().transcribe_async(str(audio_file))
+        
     def transcribe_with_assemblyai(self, audio_file):
         """Transcribe audio using AssemblyAI"""
         print("🎤 Transcribing with AssemblyAI...")
+        return self.wait_for_transcript(self.submit_transcription(audio_file))
         
+    def wait_for_transcript(self, transcript_future):
+        """Wait for a submitted transcription and return its text (None on failure)"""
         try:
-            transcriber = aai.Transcriber()
-            transcript = transcriber.transcribe(str(audio_file))
+            transcript = transcript_future.result()
             
             if transcript.status == aai.TranscriptStatus.error:
                 raise Exception(f"Transcription failed: {transcript.error}")
@@ -269,23 +284,16 @@ class DashboardCreator:
             print(f"❌ Failed to save transcript: {e}")
             return None
             
-    def run_sentiment_analysis(self, transcript_filename, identifier):
-        """Run both relevance and specificity sentiment analysis using Supabase"""
-        print("📊 Running sentiment analysis...")
-        
-        results = {}
-        
-        # Run relevance analysis directly on Supabase
-        print("  → Analyzing relevance...")
-        relevance_output_name = f"{identifier}_relevance.csv"
-        relevance_script = self.base_dir / "sentiment" / "text_insights_relevant.py"
+    def _run_analysis_script(self, script_name, transcript_filename, output_name):
+        """Run one sentiment script against a transcript in Supabase; returns stderr on failure, None on success"""
+        script = self.base_dir / "sentiment" / script_name
         
         hf_token = os.getenv("HF_TOKEN")
         cmd = [
             sys.executable,
-            str(relevance_script),
+            str(script),
             "--input-file", transcript_filename,
-            "--output-file", relevance_output_name,
+            "--output-file", output_name,
             "--output-bucket", "sentiment",
             "--supabase-url", os.getenv("SUPABASE_URL"),
             "--supabase-key", os.getenv("SUPABASE_KEY"),
@@ -294,38 +302,44 @@ class DashboardCreator:
             cmd.extend(["--hf-token", hf_token])
         
         try:
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            results['relevance_filename'] = relevance_output_name
-            print(f"  ✅ Relevance analysis complete")
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            return None
         except subprocess.CalledProcessError as e:
-            print(f"  ❌ Relevance analysis failed:")
-            print(f"     {e.stderr}")
+            return e.stderr
             
-        # Run specificity analysis
-        print("  → Analyzing specificity...")
-        specificity_output_name = f"{identifier}_specificity.csv"
-        specificity_script = self.base_dir / "sentiment" / "text_insights_specific.py"
+    def run_sentiment_analysis(self, transcript_filename, identifier):
+        """Run both relevance and specificity sentiment analysis using Supabase"""
+        print("📊 Running sentiment analysis...")
         
-        hf_token = os.getenv("HF_TOKEN")
-        cmd = [
-            sys.executable,
-            str(specificity_script),
-            "--input-file", transcript_filename,
-            "--output-file", specificity_output_name,
-            "--output-bucket", "sentiment",
-            "--supabase-url", os.getenv("SUPABASE_URL"),
-            "--supabase-key", os.getenv("SUPABASE_KEY"),
+        results = {}
+        analyses = [
+            ('relevance', "text_insights_relevant.py", f"{identifier}_relevance.csv"),
+            ('specificity', "text_insights_specific.py", f"{identifier}_specificity.csv"),
         ]
-        if hf_token:
-            cmd.extend(["--hf-token", hf_token])
         
-        try:
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            results['specificity_filename'] = specificity_output_name
-            print(f"  ✅ Specificity analysis complete")
-        except subprocess.CalledProcessError as e:
-            print(f"  ❌ Specificity analysis failed:")
-            print(f"     {e.stderr}")
+        def report(kind, output_name, error):
+            if error is None:
+                results[f'{kind}_filename'] = output_name
+                print(f"  ✅ {kind.capitalize()} analysis complete")
+            else:
+                print(f"  ❌ {kind.capitalize()} analysis failed:")
+                print(f"     {error}")
+        
+        if self.parallel_analysis:
+            # The two scripts are independent (same transcript in, separate CSVs out),
+            # so run them side by side instead of one after the other
+            print("  → Analyzing relevance and specificity...")
+            with ThreadPoolExecutor(max_workers=len(analyses)) as pool:
+                futures = [
+                    pool.submit(self._run_analysis_script, script_name, transcript_filename, output_name)
+                    for _, script_name, output_name in analyses
+                ]
+                for (kind, _, output_name), future in zip(analyses, futures):
+                    report(kind, output_name, future.result())
+        else:
+            for kind, script_name, output_name in analyses:
+                print(f"  → Analyzing {kind}...")
+                report(kind, output_name, self._run_analysis_script(script_name, transcript_filename, output_name))
             
         return results
         
@@ -357,31 +371,33 @@ class DashboardCreator:
             print(f"❌ Failed to create database entry: {e}")
             return False
             
-    def cleanup(self):
-        """Clean up temporary files"""
+    def cleanup(self, files=None):
+        """Clean up temporary files (only `files` if given, else everything in temp_dir)"""
         print("🧹 Cleaning up temporary files...")
         
         try:
-            for file in self.temp_dir.glob("*"):
-                file.unlink()
+            for file in (files if files is not None else self.temp_dir.glob("*")):
+                Path(file).unlink(missing_ok=True)
             print("✅ Cleanup complete")
         except Exception as e:
             print(f"⚠️  Cleanup warning: {e}")
             
-    def process_youtube_video(self, youtube_url, ticker_override=None):
-        """Complete pipeline to process a YouTube video"""
-        print(f"\n{'='*60}")
-        print(f"🚀 Starting Dashboard Creation Pipeline")
-        print(f"{'='*60}\n")
-        
+    def prepare_video(self, youtube_url, ticker_override=None):
+        """Resolve id, metadata, ticker and identifier, and download the audio"""
         # Extract video ID
         video_id = self.extract_video_id(youtube_url)
         if not video_id:
             print("❌ Could not extract video ID from URL")
-            return False
+            return None
             
         print(f"📹 Video ID: {video_id}")
         
+        # Start the audio download right away; it doesn't depend on the metadata
+        # lookup, so the two network calls overlap
+        pool = ThreadPoolExecutor(max_workers=1)
+        audio_future = pool.submit(self.download_audio, youtube_url)
+        pool.shutdown(wait=False)
+        
         # Get metadata (optional - continue even if fails)
         metadata = self.get_youtube_metadata(video_id)
         if not metadata:
@@ -411,50 +427,99 @@ class DashboardCreator:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         identifier = f"{ticker.lower()}_{video_id}_{timestamp}"
         
-        # Download audio
-        audio_file = self.download_audio(youtube_url)
+        # Wait for the audio download started above
+        audio_file = audio_future.result()
         if not audio_file:
-            return False
-            
-        # Transcribe with AssemblyAI
-        transcript_text = self.transcribe_with_assemblyai(audio_file)
-        if not transcript_text:
-            self.cleanup()
-            return False
+            return None
             
+        return {
+            'youtube_url': youtube_url,
+            'video_id': video_id,
+            'metadata': metadata,
+            'identifier': identifier,
+            'audio_file': audio_file,
+        }
+        
+    def finish_video(self, video, transcript_text):
+        """Save the transcript, run sentiment analysis and create the dashboard entry"""
         # Save transcript
-        transcript_filename = self.save_transcript(transcript_text, identifier)
+        transcript_filename = self.save_transcript(transcript_text, video['identifier'])
         if not transcript_filename:
-            self.cleanup()
             return False
             
         # Run sentiment analysis (uploads directly to Supabase)
-        sentiment_filenames = self.run_sentiment_analysis(transcript_filename, identifier)
+        sentiment_filenames = self.run_sentiment_analysis(transcript_filename, video['identifier'])
         
         # Create database entry
         success = self.create_database_entry(
-            video_identifier=video_id,
-            metadata=metadata,
+            video_identifier=video['video_id'],
+            metadata=video['metadata'],
             transcript_filename=transcript_filename,
             sentiment_filenames=sentiment_filenames
         )
         
-        # Cleanup
-        self.cleanup()
-        
         if success:
             print(f"\n{'='*60}")
             print(f"✅ SUCCESS! Dashboard entry created")
             print(f"{'='*60}")
-            print(f"\n📊 View at: http://localhost:3000/dashboard?video_url={youtube_url}")
-            print(f"🆔 Video Identifier: {video_id}\n")
+            print(f"\n📊 View at: http://localhost:3000/dashboard?video_url={video['youtube_url']}")
+            print(f"🆔 Video Identifier: {video['video_id']}\n")
             return True
         else:
             print(f"\n{'='*60}")
             print(f"⚠️  Partial Success - Some steps failed")
             print(f"{'='*60}\n")
             return False
-
+            
+    def process_youtube_video(self, youtube_url, ticker_override=None):
+        """Complete pipeline to process a YouTube video"""
+        print(f"\n{'='*60}")
+        print(f"🚀 Starting Dashboard Creation Pipeline")
+        print(f"{'='*60}\n")
+        
+        video = self.prepare_video(youtube_url, ticker_override)
+        if not video:
+            return False
+            
+        # Transcribe with AssemblyAI
+        transcript_text = self.transcribe_with_assemblyai(video['audio_file'])
+        if not transcript_text:
+            self.cleanup()
+            return False
+            
+        success = self.finish_video(video, transcript_text)
+        
+        # Cleanup
+        self.cleanup()
+        return success
+        
+    def process_youtube_videos(self, youtube_urls, max_downloads=4):
+        """
+        Batch pipeline: download every video's audio, submit all transcriptions to
+        AssemblyAI at once (they run concurrently on their side), then finish each
+        video as its transcript comes back. Returns the number of successes.
+        """
+        youtube_urls = list(dict.fromkeys(youtube_urls))
+        print(f"\n{'='*60}")
+        print(f"🚀 Starting Dashboard Creation Pipeline ({len(youtube_urls)} videos)")
+        print(f"{'='*60}\n")
+        
+        with ThreadPoolExecutor(max_workers=min(max_downloads, len(youtube_urls))) as pool:
+            videos = [v for v in pool.map(self.prepare_video, youtube_urls) if v]
+            
+        print(f"🎤 Submitting {len(videos)} transcriptions to AssemblyAI...")
+        transcript_futures = [self.submit_transcription(v['audio_file']) for v in videos]
+        
+        successes = 0
+        for video, transcript_future in zip(videos, transcript_futures):
+            transcript_text = self.wait_for_transcript(transcript_future)
+            if transcript_text and self.finish_video(video, transcript_text):
+                successes += 1
+            # Only this video's audio: the others may still be uploading
+            self.cleanup([video['audio_file']])
+            
+        print(f"📦 {successes}/{len(youtube_urls)} dashboards created")
+        return successes
 
 def main():
     import argparse
@@ -463,22 +528,38 @@ def main():
         description="Create a dashboard from a YouTube earnings call",
         epilog="Example: python create_dashboard_from_youtube.py 'https://youtube.com/watch?v=...' --ticker AAPL"
     )
-    parser.add_argument("youtube_url", help="YouTube video URL")
+    parser.add_argument("youtube_urls", nargs="+", metavar="youtube_url",
+                        help="YouTube video URL (several URLs are transcribed concurrently)")
     parser.add_argument(
         "--ticker", "-t",
         help="Stock ticker symbol (e.g., AAPL, TSLA). If not provided, will attempt to detect from video title.",
         default=None
     )
     
+    parser.add_argument(
+        "--parallel-analysis",
+        action="store_true",
+        help="Run the relevance and specificity analyses at the same time (faster, but both "
+             "models are in memory at once, roughly doubling peak RAM/GPU memory)"
+    )
+    
     args = parser.parse_args()
     
-    # Validate URL
-    if "youtube.com" not in args.youtube_url and "youtu.be" not in args.youtube_url:
-        print("❌ Invalid YouTube URL")
+    # Validate URLs
+    for youtube_url in args.youtube_urls:
+        if "youtube.com" not in youtube_url and "youtu.be" not in youtube_url:
+            print(f"❌ Invalid YouTube URL: {youtube_url}")
+            sys.exit(1)
+            
+    if args.ticker and len(args.youtube_urls) > 1:
+        print("❌ --ticker can only be used with a single URL")
         sys.exit(1)
         
-    creator = DashboardCreator()
-    success = creator.process_youtube_video(args.youtube_url, args.ticker)
+    creator = DashboardCreator(parallel_analysis=args.parallel_analysis)
+    if len(args.youtube_urls) == 1:
+        success = creator.process_youtube_video(args.youtube_urls[0], args.ticker)
+    else:
+        success = creator.process_youtube_videos(args.youtube_urls) == len(set(args.youtube_urls))
     
     sys.exit(0 if success else 1)
 
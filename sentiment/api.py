@@ -17,10 +17,13 @@ from typing import Optional, List
 import os
 import subprocess
 import asyncio
+import time
 from datetime import datetime
 from pathlib import Path
 import io
 import csv
+import re
+import httpx
 
 # Load environment variables
 try:
@@ -45,9 +48,20 @@ try:
         raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
     
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    # Shared HTTP/2 client for the hot read paths (storage downloads and video_analyses lookups).
+    # One pooled connection avoids a TCP+TLS handshake per request; the supabase client is kept for writes.
+    _client = httpx.AsyncClient(
+        base_url=SUPABASE_URL,
+        headers={"apikey": SUPABASE_KEY, "Authorization": f"Bearer {SUPABASE_KEY}"},
+        http2=True,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
 except Exception as e:
     print(f"⚠️  Warning: Supabase client initialization failed: {e}")
     supabase = None
+    _client = None
 
 app = FastAPI(
     title="Sentiment Analysis API",
@@ -64,8 +78,92 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory job tracking
+@app.on_event("shutdown")
+async def close_clients():
+    """Close the shared Supabase HTTP and Redis clients"""
+    if _client is not None:
+        await _client.aclose()
+    if _r is not None:
+        await _r.aclose()
+
+# Job tracking: Redis hashes with a TTL so state is shared across workers and survives restarts.
+# Falls back to an in-memory dict (single worker only) when REDIS_URL is not configured.
+JOB_TTL_SECONDS = 6 * 3600
+
+try:
+    import redis.asyncio as redis
+
+    REDIS_URL = os.getenv("REDIS_URL")
+
+    if not REDIS_URL:
+        raise ValueError("REDIS_URL must be set in environment variables")
+
+    _r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+except Exception as e:
+    print(f"⚠️  Warning: Redis unavailable, tracking jobs in memory: {e}")
+    _r = None
+
 jobs = {}
+# In-memory fallback: job_id -> monotonic time of last update, oldest first, so jobs
+# expire JOB_TTL_SECONDS after their last update just like the Redis keys
+_job_updated_at = {}
+
+def _evict_expired_jobs():
+    cutoff = time.monotonic() - JOB_TTL_SECONDS
+    while _job_updated_at:
+        job_id, updated_at = next(iter(_job_updated_at.items()))
+        if updated_at >= cutoff:
+            break
+        del _job_updated_at[job_id]
+        jobs.pop(job_id, None)
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+def _decode_job(data: dict) -> dict:
+    # Redis hashes can't hold None, so empty strings stand in for missing values
+    return {key: (value if value != "" else None) for key, value in data.items()}
+
+async def save_job(job_id: str, /, **fields):
+    """Create or update fields of a tracked job"""
+    if _r is None:
+        jobs.setdefault(job_id, {}).update(fields)
+        # Re-insert so the dict stays ordered by last update
+        _job_updated_at.pop(job_id, None)
+        _job_updated_at[job_id] = time.monotonic()
+        _evict_expired_jobs()
+        return
+    
+    key = _job_key(job_id)
+    async with _r.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={k: "" if v is None else v for k, v in fields.items()})
+        pipe.expire(key, JOB_TTL_SECONDS)
+        await pipe.execute()
+
+async def load_job(job_id: str) -> Optional[dict]:
+    """Fetch a tracked job, or None if unknown/expired"""
+    if _r is None:
+        _evict_expired_jobs()
+        return jobs.get(job_id)
+    
+    data = await _r.hgetall(_job_key(job_id))
+    return _decode_job(data) if data else None
+
+async def load_all_jobs() -> List[dict]:
+    """Fetch every tracked job that hasn't expired"""
+    if _r is None:
+        _evict_expired_jobs()
+        return list(jobs.values())
+    
+    keys = [key async for key in _r.scan_iter(match=_job_key("*"))]
+    if not keys:
+        return []
+    async with _r.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.hgetall(key)
+        results = await pipe.execute()
+    # Keys can expire between the scan and the fetch
+    return [_decode_job(data) for data in results if data]
 
 # Pydantic models
 class AnalysisRequest(BaseModel):
@@ -111,17 +209,20 @@ class VideoSentimentResponse(BaseModel):
 
 
 # Helper functions
+_YT_URL_RE = re.compile(r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)')
+_YT_ID_RE_ID_ONLY = re.compile(r'[A-Za-z0-9_-]{11}')
+
 def extract_youtube_video_id(url: str) -> Optional[str]:
-    """Extract YouTube video ID from various URL formats."""
-    import re
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)',
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+    """Extract YouTube video ID from various URL formats (or accept a raw 11-char ID)."""
+    if not url:
+        return None
+    # Cheap checks first: raw IDs and non-YouTube URLs skip the URL regex entirely
+    if len(url) == 11 and "/" not in url and "?" not in url and _YT_ID_RE_ID_ONLY.fullmatch(url):
+        return url
+    if "youtu" not in url:
+        return None
+    match = _YT_URL_RE.search(url)
+    return match.group(1) if match else None
 
 def normalize_video_identifier(dashboard_id: Optional[str], video_url: Optional[str]) -> Optional[str]:
     """Normalize to YouTube video ID format (without video_ prefix to match database)."""
@@ -147,6 +248,60 @@ def normalize_video_identifier(dashboard_id: Optional[str], video_url: Optional[
     
     return None
 
+async def download_sentiment_file(filename: str) -> bytes:
+    """Download a file from the sentiment bucket via the storage REST API."""
+    response = await _client.get(f"/storage/v1/object/sentiment/{filename}")
+    response.raise_for_status()
+    return response.content
+
+async def fetch_video_analysis(video_identifier: str) -> List[dict]:
+    """Look up video_analyses rows for an identifier via the PostgREST API."""
+    response = await _client.get(
+        "/rest/v1/video_analyses",
+        params={"select": "*", "video_identifier": f"eq.{video_identifier}"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+# CSV parsing for sentiment result files
+_NULL_VALUES = frozenset({'', 'None'})
+_INT_COLUMNS = frozenset({'sentence_index', 'label_id'})
+_FLOAT_COLUMNS = frozenset({
+    'score',
+    'specificity_0_1', 'specificity_-1_1', 'ma_specificity_0_1',
+    'relevance_0_1', 'relevance_-1_1', 'ma_relevance_0_1',
+})
+
+def _int_or_none(value: str) -> Optional[int]:
+    return None if value in _NULL_VALUES else int(value)
+
+def _float_or_none(value: str) -> Optional[float]:
+    return None if value in _NULL_VALUES else float(value)
+
+def _identity(value: str) -> Optional[str]:
+    return None if value in _NULL_VALUES else value
+
+def _convert_for_column(name: str):
+    """Pick the value converter for a CSV column once, instead of per cell."""
+    if name in _INT_COLUMNS:
+        return _int_or_none
+    if name in _FLOAT_COLUMNS:
+        return _float_or_none
+    return _identity
+
+def parse_sentiment_csv(data: bytes) -> List[dict]:
+    """Parse a sentiment result CSV into rows with numeric fields converted."""
+    reader = csv.reader(io.StringIO(data.decode('utf-8')))
+    header = next(reader, None)
+    if not header:
+        return []
+    columns = [(name, _convert_for_column(name)) for name in header]
+    return [
+        {name: convert(cell) for (name, convert), cell in zip(columns, row)}
+        for row in reader
+        if row
+    ]
+
 def generate_job_id() -> str:
     """Generate unique job ID"""
     return f"job_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
@@ -168,7 +323,7 @@ async def run_analysis_script(
 ):
     """Run analysis script in background"""
     try:
-        jobs[job_id]["status"] = "running"
+        await save_job(job_id, status="running")
         
         # Build command
         script_path = get_script_path(script_name)
@@ -196,8 +351,7 @@ async def run_analysis_script(
         stdout, stderr = await process.communicate()
         
         if process.returncode == 0:
-            jobs[job_id]["status"] = "completed"
-            jobs[job_id]["completed_at"] = datetime.now().isoformat()
+            await save_job(job_id, status="completed", completed_at=datetime.now().isoformat())
             
             # Extract output filename from stdout if auto-generated
             if not request.output_file:
@@ -209,17 +363,23 @@ async def run_analysis_script(
                         parts = line.split('at ')
                         if len(parts) > 1:
                             output_file = parts[1].strip()
-                            jobs[job_id]["output_file"] = output_file
+                            await save_job(job_id, output_file=output_file)
                             break
         else:
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = stderr.decode('utf-8')
-            jobs[job_id]["completed_at"] = datetime.now().isoformat()
+            await save_job(
+                job_id,
+                status="failed",
+                error=stderr.decode('utf-8'),
+                completed_at=datetime.now().isoformat()
+            )
     
     except Exception as e:
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
-        jobs[job_id]["completed_at"] = datetime.now().isoformat()
+        await save_job(
+            job_id,
+            status="failed",
+            error=str(e),
+            completed_at=datetime.now().isoformat()
+        )
 
 
 # API Endpoints
@@ -241,16 +401,17 @@ async def analyze_specificity(request: AnalysisRequest, background_tasks: Backgr
     """
     job_id = generate_job_id()
     
-    jobs[job_id] = {
-        "job_id": job_id,
-        "status": "pending",
-        "analysis_type": "specificity",
-        "input_file": request.input_file,
-        "output_file": request.output_file,
-        "created_at": datetime.now().isoformat(),
-        "completed_at": None,
-        "error": None
-    }
+    await save_job(
+        job_id,
+        job_id=job_id,
+        status="pending",
+        analysis_type="specificity",
+        input_file=request.input_file,
+        output_file=request.output_file,
+        created_at=datetime.now().isoformat(),
+        completed_at=None,
+        error=None
+    )
     
     # Run analysis in background
     background_tasks.add_task(
@@ -275,16 +436,17 @@ async def analyze_relevance(request: AnalysisRequest, background_tasks: Backgrou
     """
     job_id = generate_job_id()
     
-    jobs[job_id] = {
-        "job_id": job_id,
-        "status": "pending",
-        "analysis_type": "relevance",
-        "input_file": request.input_file,
-        "output_file": request.output_file,
-        "created_at": datetime.now().isoformat(),
-        "completed_at": None,
-        "error": None
-    }
+    await save_job(
+        job_id,
+        job_id=job_id,
+        status="pending",
+        analysis_type="relevance",
+        input_file=request.input_file,
+        output_file=request.output_file,
+        created_at=datetime.now().isoformat(),
+        completed_at=None,
+        error=None
+    )
     
     # Run analysis in background
     background_tasks.add_task(
@@ -307,17 +469,18 @@ async def get_job_status(job_id: str):
     """
     Get status of an analysis job
     """
-    if job_id not in jobs:
+    job = await load_job(job_id)
+    if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return JobStatus(**jobs[job_id])
+    return JobStatus(**job)
 
 @app.get("/jobs", response_model=List[JobStatus])
 async def list_jobs():
     """
     List all jobs
     """
-    return [JobStatus(**job) for job in jobs.values()]
+    return [JobStatus(**job) for job in await load_all_jobs()]
 
 @app.get("/transcripts", response_model=List[FileInfo])
 async def list_transcripts():
@@ -399,7 +562,7 @@ async def get_sentiment_file(filename: str):
     
     try:
         # Download file from Supabase
-        data = supabase.storage.from_("sentiment").download(filename)
+        data = await download_sentiment_file(filename)
         
         # Return as streaming response
         return StreamingResponse(
@@ -422,27 +585,10 @@ async def get_sentiment_data(filename: str):
     
     try:
         # Download file from Supabase
-        data = supabase.storage.from_("sentiment").download(filename)
+        data = await download_sentiment_file(filename)
         
         # Parse CSV
-        csv_text = data.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(csv_text))
-        
-        rows = []
-        for row in csv_reader:
-            # Convert numeric fields
-            processed_row = {}
-            for key, value in row.items():
-                if value == '' or value == 'None':
-                    processed_row[key] = None
-                elif key in ['sentence_index', 'label_id']:
-                    processed_row[key] = int(value) if value else None
-                elif key in ['score', 'specificity_0_1', 'specificity_-1_1', 'ma_specificity_0_1',
-                           'relevance_0_1', 'relevance_-1_1', 'ma_relevance_0_1']:
-                    processed_row[key] = float(value) if value else None
-                else:
-                    processed_row[key] = value
-            rows.append(processed_row)
+        rows = parse_sentiment_csv(data)
         
         return {
             "filename": filename,
@@ -487,12 +633,12 @@ async def _get_sentiment_data_by_identifier(video_identifier: Optional[str]) ->
     
     try:
         # Look up in database
-        result = supabase.table("video_analyses").select("*").eq("video_identifier", video_identifier).execute()
+        records = await fetch_video_analysis(video_identifier)
         
-        if not result.data or len(result.data) == 0:
+        if not records:
             raise HTTPException(status_code=404, detail=f"Video analysis not found for identifier: {video_identifier}")
         
-        record = result.data[0]
+        record = records[0]
         relevance_filename = record.get("relevance_filename")
         specificity_filename = record.get("specificity_filename")
 
@@ -512,41 +658,14 @@ async def _get_sentiment_data_by_identifier(video_identifier: Optional[str]) ->
         
         # Fetch both data files using existing endpoint logic
         try:
-            # Relevance data
-            relevance_data_raw = supabase.storage.from_("sentiment").download(relevance_filename)
-            relevance_csv = relevance_data_raw.decode('utf-8')
-            relevance_reader = csv.DictReader(io.StringIO(relevance_csv))
-            relevance_rows = []
-            for row in relevance_reader:
-                processed_row = {}
-                for key, value in row.items():
-                    if value == '' or value == 'None':
-                        processed_row[key] = None
-                    elif key in ['sentence_index', 'label_id']:
-                        processed_row[key] = int(value) if value else None
-                    elif key in ['score', 'relevance_0_1', 'relevance_-1_1', 'ma_relevance_0_1']:
-                        processed_row[key] = float(value) if value else None
-                    else:
-                        processed_row[key] = value
-                relevance_rows.append(processed_row)
-            
-            # Specificity data
-            specificity_data_raw = supabase.storage.from_("sentiment").download(specificity_filename)
-            specificity_csv = specificity_data_raw.decode('utf-8')
-            specificity_reader = csv.DictReader(io.StringIO(specificity_csv))
-            specificity_rows = []
-            for row in specificity_reader:
-                processed_row = {}
-                for key, value in row.items():
-                    if value == '' or value == 'None':
-                        processed_row[key] = None
-                    elif key in ['sentence_index', 'label_id']:
-                        processed_row[key] = int(value) if value else None
-                    elif key in ['score', 'specificity_0_1', 'specificity_-1_1', 'ma_specificity_0_1']:
-                        processed_row[key] = float(value) if value else None
-                    else:
-                        processed_row[key] = value
-                specificity_rows.append(processed_row)
+            # Download both files concurrently over the shared connection
+            relevance_data_raw, specificity_data_raw = await asyncio.gather(
+                download_sentiment_file(relevance_filename),
+                download_sentiment_file(specificity_filename),
+            )
+
+            relevance_rows = parse_sentiment_csv(relevance_data_raw)
+            specificity_rows = parse_sentiment_csv(specificity_data_raw)
             
             return VideoSentimentResponse(
                 relevance_data={
@@ -652,4 +771,15 @@ async def delete_from_library(video_identifier: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Without Redis each worker has its own in-memory job dict, so polls would miss jobs
+    workers = int(os.getenv("WEB_WORKERS", "2" if os.getenv("REDIS_URL") else "1"))
+    if workers > 1 and not os.getenv("REDIS_URL"):
+        raise ValueError("WEB_WORKERS > 1 requires REDIS_URL for shared job tracking")
+    uvicorn.run(
+        "api:app",
+        host="0.0.0.0",
+        port=8001,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+    )
\ No newline at end of file
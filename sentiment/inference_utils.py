@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helpers shared by text_insights_relevant.py and text_insights_specific.py:
+model loading (HF snapshot, cached ONNX export), sentence splitting and the
+moving-average / CSV formatting used when streaming rows. Both scripts must split
+a transcript into the same sentences, since the dashboard lines their CSVs up by index.
+"""
+
+import os
+import re
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+# --- Model loading ---------------------------------------------------------------
+
+def resolve_model_path(model_name: str, revision: Optional[str] = None) -> str:
+    """
+    Return a local snapshot directory for the model. Uses the HF cache without any
+    network round-trip when the snapshot is already there; otherwise downloads only
+    the config, tokenizer and weight files.
+    """
+    if os.path.isdir(model_name):
+        return model_name
+    from huggingface_hub import list_repo_files, snapshot_download
+    try:
+        return snapshot_download(repo_id=model_name, revision=revision, local_files_only=True)
+    except Exception:
+        pass
+    # Only what from_pretrained needs: config, tokenizer files and one weight format
+    # (safetensors when the repo has them), not every file in the repo
+    files = list_repo_files(model_name, revision=revision)
+    weights = ["*.safetensors"] if any(f.endswith(".safetensors") for f in files) else ["pytorch_model*.bin"]
+    return snapshot_download(
+        repo_id=model_name,
+        revision=revision,
+        allow_patterns=["*.json", "*.txt", "*.model", *weights]
+    )
+
+
+# Exported ONNX models are cached here (one directory per model name/revision)
+ONNX_CACHE_DIR = Path(os.environ.get("ONNX_CACHE_DIR", Path.home() / ".cache" / "simpli-earn" / "onnx"))
+
+
+def load_onnx_model(
+    model_name: str,
+    device: int,
+    quantize: Optional[str] = None,
+    revision: Optional[str] = None
+):
+    """
+    Load the classifier as an ONNX Runtime model with full graph optimizations.
+    The export is cached on disk per model name/revision so it only happens once.
+    With quantize="int8", the export is additionally dynamically quantized (also cached).
+    """
+    try:
+        import onnxruntime as ort
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError:
+        raise ImportError(
+            "optimum[onnxruntime] package not found. Install with: pip install 'optimum[onnxruntime]'"
+        )
+
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    provider = "CUDAExecutionProvider" if device >= 0 else "CPUExecutionProvider"
+
+    export_dir = ONNX_CACHE_DIR / (model_name.replace("/", "__") + (f"@{revision}" if revision else ""))
+    quant_dir = export_dir.with_name(export_dir.name + "__int8")
+
+    # Warm int8 cache: load only the quantized session, never the fp32 one
+    if quantize == "int8" and (quant_dir / "model_quantized.onnx").exists():
+        return ORTModelForSequenceClassification.from_pretrained(
+            quant_dir,
+            file_name="model_quantized.onnx",
+            provider="CPUExecutionProvider",
+            session_options=session_options
+        )
+
+    if (export_dir / "model.onnx").exists():
+        model = ORTModelForSequenceClassification.from_pretrained(
+            export_dir, provider=provider, session_options=session_options
+        )
+    else:
+        model = ORTModelForSequenceClassification.from_pretrained(
+            resolve_model_path(model_name, revision),
+            export=True,
+            provider=provider,
+            session_options=session_options
+        )
+        model.save_pretrained(export_dir)
+
+    if quantize != "int8":
+        return model
+
+    # Dynamic int8 weights; the quantized graph runs on the CPU provider (VNNI where available)
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    ORTQuantizer.from_pretrained(model).quantize(save_dir=quant_dir, quantization_config=qconfig)
+    model.config.save_pretrained(quant_dir)
+
+    return ORTModelForSequenceClassification.from_pretrained(
+        quant_dir,
+        file_name="model_quantized.onnx",
+        provider="CPUExecutionProvider",
+        session_options=session_options
+    )
+
+
+# --- Sentence splitting ----------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def get_nlp():
+    """
+    Load en_core_web_sm once with only the statistical sentence segmenter ("senter")
+    enabled. senter has its own embedding layer, so the shared tok2vec goes too.
+    Returns None if spaCy or the model isn't installed.
+    """
+    try:
+        import spacy
+        nlp = spacy.load(
+            "en_core_web_sm",
+            exclude=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+        )
+        nlp.enable_pipe("senter")
+        return nlp
+    except Exception:
+        return None
+
+
+# Split on ., !, ? followed by space/newline, keep abbreviations somewhat intact
+SENT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def naive_sentence_split(text: str) -> List[str]:
+    """
+    Very simple sentence splitter on punctuation, used when spaCy isn't available.
+    """
+    return [p for p in (p.strip() for p in SENT_RE.split(text.strip())) if p]
+
+
+def doc_sentences(doc) -> List[str]:
+    """Non-empty, stripped sentence texts of a spaCy Doc."""
+    return [s.text.strip() for s in doc.sents if s.text.strip()]
+
+
+def split_sentences(
+    text: str,
+    fallback: Callable[[str], List[str]] = naive_sentence_split
+) -> List[str]:
+    """
+    Try spaCy with en_core_web_sm; otherwise fall back to the punctuation splitter.
+    `fallback` must return the same pieces as naive_sentence_split (it may be faster).
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    nlp = get_nlp()
+    if nlp is not None:
+        try:
+            sents = doc_sentences(nlp(text))
+            if sents:
+                return sents
+        except Exception:
+            pass
+    return fallback(text)
+
+
+# --- Scoring / CSV helpers -----------------------------------------------------
+
+def moving_average(values: List[float], window: int) -> List[Optional[float]]:
+    """
+    Simple trailing moving average; first window-1 entries are None.
+    NaN values (sentences that were not scored) are left out of each window's
+    mean; a window with no values at all gives None.
+    """
+    if window <= 1 or not values:
+        return [None for _ in values]
+    v = np.asarray(values, dtype=np.float64)
+    if v.size < window:
+        return [None for _ in values]
+    # O(n) via prefix sums instead of np.convolve's O(n * window)
+    valid = ~np.isnan(v)
+    c = np.empty(v.size + 1, dtype=np.float64)
+    c[0] = 0.0
+    np.cumsum(np.where(valid, v, 0.0), out=c[1:])
+    n = np.empty(v.size + 1, dtype=np.int64)
+    n[0] = 0
+    np.cumsum(valid, out=n[1:])
+    counts = n[window:] - n[:-window]
+    sm = (c[window:] - c[:-window]) / np.maximum(counts, 1)
+    pad = [None] * (window - 1)
+    return pad + [None if cnt == 0 else val for val, cnt in zip(sm.tolist(), counts.tolist())]
+
+
+def moving_average_step(
+    values: List[float],
+    window: int,
+    history: deque
+) -> List[Optional[float]]:
+    """
+    Trailing moving average over one chunk of a longer series.
+    `history` is a deque(maxlen=window - 1) that carries the tail of the previous
+    chunks between calls, so the concatenated output equals moving_average() over
+    the full series.
+    """
+    if window <= 1:
+        return [None for _ in values]
+    prev = list(history)
+    history.extend(values)
+    return moving_average(prev + list(values), window)[len(prev):]
+
+
+def fmt6(values) -> List[str]:
+    """
+    Format floats to 6 decimals for the CSV in one pass (None/NaN -> empty cell),
+    instead of rounding each value and letting csv call str() on it again.
+    """
+    return ["" if v is None or v != v else f"{v:.6f}" for v in values]
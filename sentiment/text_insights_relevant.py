@@ -7,9 +7,18 @@ import os
 import sys
 from typing import List, Tuple, Optional
 import tempfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
+from inference_utils import (
+    doc_sentences, fmt6, get_nlp, load_onnx_model, moving_average_step, naive_sentence_split,
+    resolve_model_path, split_sentences
+)
+
 # Load .env file if available
 try:
     from dotenv import load_dotenv
@@ -69,22 +78,24 @@ def upload_file_to_supabase(
     bucket_name: str,
     local_file_path: str,
     destination_path: str,
-    content_type: str = "text/csv"
+    content_type: str = "text/csv",
+    upsert: bool = False
 ) -> str:
     """
     Upload a local file to Supabase Storage.
+    Set upsert=True only when the destination may already exist; a plain upload skips
+    the server-side existence check.
     Returns the public URL or path.
     """
     try:
+        # Upload file, passing the open handle so the HTTP layer streams it instead of
+        # holding the whole CSV in memory
         with open(local_file_path, 'rb') as f:
-            file_data = f.read()
-        
-        # Upload file
-        response = client.storage.from_(bucket_name).upload(
-            path=destination_path,
-            file=file_data,
-            file_options={"content-type": content_type, "upsert": "true"}
-        )
+            response = client.storage.from_(bucket_name).upload(
+                path=destination_path,
+                file=f,
+                file_options={"content-type": content_type, "upsert": "true" if upsert else "false"}
+            )
         
         print(f"✅ Uploaded: {local_file_path} to bucket '{bucket_name}' at {destination_path}")
         return destination_path
@@ -111,44 +122,37 @@ def insert_record_to_table(
 
 # ---------- Sentence splitting ----------
 
-def split_sentences(text: str) -> List[str]:
+def split_sentences_batch(texts: List[str], batch_size: int = 64, n_process: Optional[int] = None) -> List[List[str]]:
     """
-    Try spaCy with en_core_web_sm; otherwise fall back to a simple regex splitter.
+    Split several transcripts at once with nlp.pipe, spreading documents across processes.
+    Falls back to the regex splitter per document if spaCy isn't available.
     """
-    text = (text or "").strip()
-    if not text:
-        return []
-    # Try spaCy
-    try:
-        import spacy
-        try:
-            nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            return naive_sentence_split(text)
-        doc = nlp(text)
-        sents = [s.text.strip() for s in doc.sents if s.text.strip()]
-        if sents:
-            return sents
-    except Exception:
-        pass
-    return naive_sentence_split(text)
-
-def naive_sentence_split(text: str) -> List[str]:
-    import re
-    parts = re.split(r"(?<=[.!?])\s+", text.strip())
-    return [p.strip() for p in parts if p.strip()]
+    texts = [(t or "").strip() for t in texts]
+    nlp = get_nlp()
+    if nlp is None or not texts:
+        return [naive_sentence_split(t) for t in texts]
+    n_process = n_process or min(os.cpu_count() or 1, len(texts))
+    results = []
+    for text, doc in zip(texts, nlp.pipe(texts, batch_size=batch_size, n_process=n_process)):
+        results.append(doc_sentences(doc) or naive_sentence_split(text))
+    return results
 
 # ---------- HF inference ----------
 
-def load_classifier(model_name: str, hf_token: Optional[str], device: Optional[int]):
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+def load_classifier(
+    model_name: str,
+    hf_token: Optional[str],
+    device: Optional[int],
+    backend: str = "pt",
+    quantize: Optional[str] = None,
+    revision: Optional[str] = None,
+    compile_model: bool = False
+):
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
     if hf_token:
         from huggingface_hub import login
         login(token=hf_token)
 
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSequenceClassification.from_pretrained(model_name)
-
     # Auto device detect unless user specified
     if device is None:
         try:
@@ -157,27 +161,86 @@ def load_classifier(model_name: str, hf_token: Optional[str], device: Optional[i
         except Exception:
             device = -1
 
-    clf = pipeline(
-        "text-classification",
-        model=model,
-        tokenizer=tokenizer,
-        framework="pt",
-        device=device,
-        truncation=True
-    )
-    return clf, model
-
-def run_inference(clf, sentences: List[str], max_length: int = 512, batch_size: int = 32) -> List[dict]:
-    results: List[dict] = []
+    # The int8 ONNX graph only runs on the CPU provider
+    if quantize:
+        device = -1
+
+    # Load from the local snapshot so cached runs never revalidate against the hub
+    model_path = resolve_model_path(model_name, revision)
+    tokenizer = AutoTokenizer.from_pretrained(model_path, local_files_only=True, use_fast=True)
+    if backend == "onnx":
+        model = load_onnx_model(model_name, device, quantize, revision)
+    else:
+        # Half precision on GPU: tensor-core matmuls and half the activation memory
+        model_kwargs = {}
+        if device >= 0:
+            import torch
+            model_kwargs["torch_dtype"] = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        model = AutoModelForSequenceClassification.from_pretrained(model_path, local_files_only=True, **model_kwargs)
+        model.eval()
+        for param in model.parameters():
+            param.requires_grad_(False)
+        if device >= 0:
+            model.to(device)
+        if compile_model:
+            # Kernel fusion via Inductor; the first batches of each new shape pay a compile cost
+            import torch
+            model = torch.compile(model, mode="reduce-overhead", fullgraph=False)
+
+    return tokenizer, model
+
+# Padded sequence lengths used with --compile, so the compiled graph only sees a few shapes
+SEQ_LEN_BUCKETS = (32, 64, 128, 256, 512)
+
+def next_bucket(length: int, max_length: int) -> int:
+    for bucket in SEQ_LEN_BUCKETS:
+        if length <= bucket:
+            return max(length, min(bucket, max_length))
+    return length
+
+def run_inference(
+    tokenizer,
+    model,
+    sentences: List[str],
+    max_length: int = 512,
+    batch_size: int = 32,
+    pad_to_buckets: bool = False
+) -> List[dict]:
+    """
+    Batched forward passes straight through the model. Returns one {'label', 'score'} dict
+    per sentence (label named via config.id2label, like the HF pipeline).
+    With pad_to_buckets, each batch is padded up to the next SEQ_LEN_BUCKETS length.
+    """
     if not sentences:
-        return results
-    for i in range(0, len(sentences), batch_size):
-        batch = sentences[i:i+batch_size]
-        out = clf(batch, truncation=True, max_length=max_length)
-        if isinstance(out, dict):
-            results.append(out)
-        else:
-            results.extend(out)
+        return []
+    import torch
+
+    # Tokenize and truncate everything once with the fast tokenizer
+    enc = tokenizer(sentences, truncation=True, max_length=max_length)
+    input_ids = enc["input_ids"]
+    id2label = model.config.id2label
+
+    # Sort by token length so each batch pads to roughly its own length, then restore order
+    order = sorted(range(len(sentences)), key=lambda i: len(input_ids[i]))
+
+    results: List[dict] = [None] * len(sentences)
+    # inference_mode skips autograd bookkeeping that no_grad still pays for
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            idxs = order[start:start + batch_size]
+            pad_kwargs = {}
+            if pad_to_buckets:
+                batch_len = max(len(input_ids[i]) for i in idxs)
+                pad_kwargs = {"padding": "max_length", "max_length": next_bucket(batch_len, max_length)}
+            batch = tokenizer.pad(
+                {key: [enc[key][i] for i in idxs] for key in enc.keys()},
+                return_tensors="pt",
+                **pad_kwargs
+            ).to(model.device)
+            logits = model(**batch).logits
+            scores, label_ids = logits.float().softmax(-1).max(-1)
+            for i, score, label_id in zip(idxs, scores.tolist(), label_ids.tolist()):
+                results[i] = {"label": id2label.get(label_id, f"LABEL_{label_id}"), "score": score}
     return results
 
 # ---------- Scoring normalization ----------
@@ -194,37 +257,44 @@ def resolve_label_name(raw_label: str, id2label: Optional[dict]) -> Tuple[str, i
         readable = id2label[numeric_id]
     return readable, (numeric_id if numeric_id is not None else -1)
 
+_BASES_0_1_BY_ID = {0: 0.00, 1: 0.34, 2: 0.67}
+_BASES_MINUS1_1_BY_ID = {0: -1.00, 1: -0.33, 2: 0.34}
+
 def relevance_0_to_1(label_id: int, score: float) -> float:
     """
     Map 3-class label to [0,1]:
       0 -> 0.00..0.33, 1 -> 0.34..0.66, 2 -> 0.67..1.00
     """
-    bases = {0: 0.00, 1: 0.34, 2: 0.67}
-    base = bases.get(label_id, 0.00)
-    width = 0.33
-    val = base + score * width
-    return max(0.0, min(1.0, val))
+    val = _BASES_0_1_BY_ID.get(label_id, 0.00) + score * 0.33
+    # Chained comparison instead of max(min(...)): no extra function calls on the common path
+    return val if 0.0 <= val <= 1.0 else (0.0 if val < 0.0 else 1.0)
 
 def relevance_minus1_to_1(label_id: int, score: float) -> float:
     """
     Alternate mapping to [-1,1]:
       0 -> -1.00..-0.34, 1 -> -0.33..+0.33, 2 -> +0.34..+1.00
     """
-    bases = {0: -1.00, 1: -0.33, 2: 0.34}
-    base = bases.get(label_id, -1.00)
-    width = 0.66
-    val = base + score * width
-    return max(-1.0, min(1.0, val))
-
-def moving_average(values: List[float], window: int) -> List[Optional[float]]:
-    if window <= 1 or not values:
-        return [None for _ in values]
-    import numpy as np
-    v = np.array(values, dtype=float)
-    kernel = np.ones(window, dtype=float) / float(window)
-    sm = np.convolve(v, kernel, mode="valid").tolist()
-    pad = [None] * (window - 1)
-    return pad + sm
+    val = _BASES_MINUS1_1_BY_ID.get(label_id, -1.00) + score * 0.66
+    return val if -1.0 <= val <= 1.0 else (-1.0 if val < -1.0 else 1.0)
+
+# Vectorized versions of the mappings above; the trailing entry is the base for unknown labels
+_BASES_0_1 = np.array([0.00, 0.34, 0.67, 0.00])
+_BASES_MINUS1_1 = np.array([-1.00, -0.33, 0.34, -1.00])
+
+def _base_index(label_ids: np.ndarray) -> np.ndarray:
+    return np.where((label_ids >= 0) & (label_ids <= 2), label_ids, 3)
+
+def relevance_0_to_1_array(label_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    relevance_0_to_1 over whole arrays of label ids and scores.
+    """
+    return np.clip(_BASES_0_1[_base_index(label_ids)] + scores * 0.33, 0.0, 1.0)
+
+def relevance_minus1_to_1_array(label_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    relevance_minus1_to_1 over whole arrays of label ids and scores.
+    """
+    return np.clip(_BASES_MINUS1_1[_base_index(label_ids)] + scores * 0.66, -1.0, 1.0)
 
 # ---------- I/O ----------
 
@@ -236,23 +306,57 @@ def read_text_input(transcript_path: Optional[str], stdin_fallback: bool) -> str
         return sys.stdin.read()
     raise ValueError("No transcript provided. Use --input /path/to/file.txt or pipe text with --stdin.")
 
-def write_csv(rows: List[dict], out_path: str):
-    fieldnames = [
-        "sentence_index",
-        "sentence_text",
-        "raw_label",
-        "label_id",
-        "label_name",
-        "score",
-        "relevance_0_1",
-        "relevance_-1_1",
-        "ma_relevance_0_1",
-    ]
-    with open(out_path, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+CSV_FIELDNAMES = [
+    "sentence_index",
+    "sentence_text",
+    "raw_label",
+    "label_id",
+    "label_name",
+    "score",
+    "relevance_0_1",
+    "relevance_-1_1",
+    "ma_relevance_0_1",
+]
+
+# Sentences classified, scored and written per chunk (in units of --batch-size); bounds the
+# number of result rows held in memory while leaving room for length-sorted batching
+STREAM_CHUNK_BATCHES = 16
+# Results kept for repeated sentences across chunks ("Thank you.", "Next question.");
+# a bounded LRU so memory stays independent of transcript length
+DEDUP_CACHE_SIZE = 4096
+
+def relevance_rows(
+    start_index: int,
+    sentences: List[str],
+    results: List[dict],
+    id2label: Optional[dict],
+    window: int,
+    ma_history: deque
+):
+    """
+    CSV rows (in CSV_FIELDNAMES order) for one chunk of classified sentences.
+    """
+    raw_labels = [res.get("label", "LABEL_0") for res in results]
+    resolved = [resolve_label_name(raw_label, id2label) for raw_label in raw_labels]
+    n = len(resolved)
+    label_ids = np.fromiter((label_id for _, label_id in resolved), dtype=np.int64, count=n)
+    scores = np.fromiter((float(res.get("score", 0.0)) for res in results), dtype=np.float64, count=n)
+
+    rel01 = relevance_0_to_1_array(label_ids, scores)
+    relm1 = relevance_minus1_to_1_array(label_ids, scores)
+    ma = moving_average_step(rel01.tolist(), window, ma_history)
+
+    return zip(
+        range(start_index, start_index + n),
+        sentences,
+        raw_labels,
+        label_ids.tolist(),
+        [readable for readable, _ in resolved],
+        fmt6(scores.tolist()),
+        fmt6(rel01.tolist()),
+        fmt6(relm1.tolist()),
+        fmt6(ma),
+    )
 
 # ---------- Main ----------
 
@@ -267,6 +371,10 @@ def main():
     parser.add_argument("--stdin", action="store_true",
                         help="Read transcript text from STDIN when --input is not provided.")
     
+    parser.add_argument("--sentences-per-line", action="store_true",
+                        help="Treat each non-empty input line as one sentence and skip sentence splitting. "
+                             "Pass it to text_insights_specific.py too so both CSVs have the same sentences.")
+    
     # Supabase options
     parser.add_argument("--supabase-url", type=str, default=os.environ.get("SUPABASE_URL"),
                         help="Supabase project URL (or set SUPABASE_URL env var)")
@@ -288,12 +396,20 @@ def main():
     # Model options
     parser.add_argument("--model", type=str, default="gtfintechlab/SubjECTiveQA-RELEVANT",
                         help="Hugging Face model repo id")
+    parser.add_argument("--model-revision", type=str, default=None,
+                        help="Pin the Hugging Face model revision (branch, tag or commit). Default: latest.")
     parser.add_argument("--hf-token", type=str, default=os.environ.get("HF_TOKEN"),
                         help="Hugging Face token (env HF_TOKEN or pass here). Not required for public models.")
     parser.add_argument("--batch-size", type=int, default=32, help="Batch size (default: 32)")
     parser.add_argument("--max-length", type=int, default=512, help="Max tokens per sentence (default: 512)")
     parser.add_argument("--device", type=int, default=None,
-                        help="Transformers pipeline device: -1=CPU, 0=GPU0. Default: auto-detect.")
+                        help="Inference device: -1=CPU, 0=GPU0. Default: auto-detect.")
+    parser.add_argument("--backend", type=str, choices=["pt", "onnx"], default="pt",
+                        help="Inference backend: pt=PyTorch, onnx=ONNX Runtime via optimum (default: pt)")
+    parser.add_argument("--compile", action="store_true",
+                        help="torch.compile the PyTorch model (faster steady state, slower first batches)")
+    parser.add_argument("--quantize", type=str, choices=["int8"], default=None,
+                        help="Dynamically quantize the ONNX model (CPU only; implies --backend onnx)")
     parser.add_argument("--ma-window", type=int, default=20,
                         help="Moving average window over relevance_0_1 (default: 20; set 0/1 to disable).")
     
@@ -323,38 +439,54 @@ def main():
         supabase_client = get_supabase_client(args.supabase_url, args.supabase_key)
         print(f"✅ Connected to Supabase")
 
-    # Download input from Supabase if specified
-    local_input_path = args.input
-    if use_supabase and args.input_file:
-        # Create temp file for download
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as tmp:
-            temp_input_path = tmp.name
-        
-        download_file_from_supabase(
-            supabase_client,
-            args.input_bucket,
-            args.input_file,
-            temp_input_path
+    # Load the classifier in the background so it overlaps with the transcript download
+    # and sentence split; both the download and the weight load are I/O-bound
+    print(f"🤖 Loading model: {args.model}")
+    backend = "onnx" if args.quantize else args.backend
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        model_future = executor.submit(
+            load_classifier,
+            args.model,
+            args.hf_token,
+            args.device,
+            backend,
+            args.quantize,
+            args.model_revision,
+            args.compile
         )
-        local_input_path = temp_input_path
 
-    # 1) Read transcript
-    text = read_text_input(local_input_path, stdin_fallback=args.stdin)
-
-    # 2) Split into sentences
-    print(f"📝 Splitting text into sentences...")
-    sentences = split_sentences(text)
-    print(f"   Found {len(sentences)} sentences")
-
-    # 3) Load classifier
-    print(f"🤖 Loading model: {args.model}")
-    clf, model = load_classifier(args.model, args.hf_token, args.device)
+        # Download input from Supabase if specified
+        local_input_path = args.input
+        if use_supabase and args.input_file:
+            # Create temp file for download
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as tmp:
+                temp_input_path = tmp.name
+            
+            download_future = executor.submit(
+                download_file_from_supabase,
+                supabase_client,
+                args.input_bucket,
+                args.input_file,
+                temp_input_path
+            )
+            local_input_path = download_future.result()
+
+        # 1) Read transcript
+        text = read_text_input(local_input_path, stdin_fallback=args.stdin)
+
+        # 2) Split into sentences (skipping the NLP splitter if lines already are sentences)
+        if args.sentences_per_line:
+            print(f"📝 Using one sentence per line...")
+            sentences = [ln.strip() for ln in text.splitlines() if ln.strip()]
+        else:
+            print(f"📝 Splitting text into sentences...")
+            sentences = split_sentences(text)
+        print(f"   Found {len(sentences)} sentences")
 
-    # 4) Inference
-    print(f"🔍 Running inference...")
-    results = run_inference(clf, sentences, max_length=args.max_length, batch_size=args.batch_size)
+        # 3) Wait for the classifier
+        tokenizer, model = model_future.result()
 
-    # 5) Label names (if provided by model)
+    # 4) Label names (if provided by model)
     id2label = None
     try:
         id2label = getattr(model.config, "id2label", None)
@@ -363,41 +495,44 @@ def main():
     except Exception:
         id2label = None
 
-    # 6) Build CSV rows
-    rows = []
-    rel01_series = []
-    for idx, (sent, res) in enumerate(zip(sentences, results)):
-        raw_label = res.get("label", "LABEL_0")
-        score = float(res.get("score", 0.0))
-        readable, label_id = resolve_label_name(raw_label, id2label)
-
-        r01 = relevance_0_to_1(label_id, score)
-        rm1 = relevance_minus1_to_1(label_id, score)
-        rel01_series.append(r01)
-
-        rows.append({
-            "sentence_index": idx,
-            "sentence_text": sent,
-            "raw_label": raw_label,
-            "label_id": label_id,
-            "label_name": readable,
-            "score": round(score, 6),
-            "relevance_0_1": round(r01, 6),
-            "relevance_-1_1": round(rm1, 6),
-            "ma_relevance_0_1": None,  # fill after MA
-        })
-
-    # 7) Moving average
+    # 5) Classify, score and write chunk by chunk so only one chunk of rows is in memory.
+    # The moving average carries across chunks via ma_history.
     window = max(0, int(args.ma_window or 0))
-    if window >= 2 and rel01_series:
-        print(f"📊 Computing moving average (window={window})...")
-        ma = moving_average(rel01_series, window)
-        for r, ma_val in zip(rows, ma):
-            r["ma_relevance_0_1"] = None if ma_val is None else round(float(ma_val), 6)
+    ma_history = deque(maxlen=max(window - 1, 0))
+    chunk_size = max(1, args.batch_size) * STREAM_CHUNK_BATCHES
+    result_by_sentence = OrderedDict()
 
-    # 8) Write CSV
-    write_csv(rows, args.output)
-    print(f"✅ Wrote {len(rows)} rows to: {args.output}")
+    print(f"🔍 Running inference...")
+    if window >= 2:
+        print(f"📊 Computing moving average (window={window})...")
+    with open(args.output, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDNAMES)
+        for start in range(0, len(sentences), chunk_size):
+            chunk = sentences[start:start + chunk_size]
+
+            # Repeated sentences like "Thank you." only need one forward pass
+            pending = [sent for sent in dict.fromkeys(chunk) if sent not in result_by_sentence]
+            if pending:
+                result_by_sentence.update(zip(pending, run_inference(
+                    tokenizer,
+                    model,
+                    pending,
+                    max_length=args.max_length,
+                    batch_size=args.batch_size,
+                    pad_to_buckets=args.compile
+                )))
+            results = [result_by_sentence[sent] for sent in chunk]
+
+            # Keep recently seen sentences (fillers recur throughout a call), evict the rest
+            for sent in chunk:
+                result_by_sentence.move_to_end(sent)
+            while len(result_by_sentence) > DEDUP_CACHE_SIZE:
+                result_by_sentence.popitem(last=False)
+
+            writer.writerows(relevance_rows(start, chunk, results, id2label, window, ma_history))
+
+    print(f"✅ Wrote {len(sentences)} rows to: {args.output}")
 
     # Upload to Supabase if enabled
     if use_supabase:
@@ -413,7 +548,9 @@ def main():
             args.output_bucket,
             args.output,
             output_path,
-            content_type="text/csv"
+            content_type="text/csv",
+            # Auto-generated names are timestamped and unique; only a caller-chosen path can collide
+            upsert=bool(args.output_file)
         )
         
         # Track metadata if requested
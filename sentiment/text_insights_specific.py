@@ -3,13 +3,23 @@
 
 import argparse
 import csv
+import json
+import mmap
 import os
 import sys
 from typing import List, Tuple, Optional
 import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
+from inference_utils import fmt6, load_onnx_model, moving_average_step
+from inference_utils import naive_sentence_split as regex_sentence_split
+from inference_utils import split_sentences as split_sentences_shared
+
 # Load .env file if available
 try:
     from dotenv import load_dotenv
@@ -40,6 +50,42 @@ def get_supabase_client(url: str, key: str):
     return client
 
 
+# Shared HTTP client for every Supabase REST call (download, upload, metadata insert),
+# created on first use so the TCP+TLS connection is set up once and reused.
+_HTTP = None
+
+
+def _get_http_client():
+    """
+    Return the process-wide httpx.Client, creating it on first use.
+    HTTP/2 (one multiplexed connection) when the h2 package is installed.
+    """
+    global _HTTP
+    if _HTTP is None:
+        import httpx
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        _HTTP = httpx.Client(http2=http2, timeout=60)
+    return _HTTP
+
+
+def close_http_client():
+    global _HTTP
+    if _HTTP is not None:
+        _HTTP.close()
+        _HTTP = None
+
+
+def _supabase_auth_headers(client) -> dict:
+    return {
+        "apikey": client.supabase_key,
+        "Authorization": f"Bearer {client.supabase_key}",
+    }
+
+
 def download_file_from_supabase(
     client,
     bucket_name: str,
@@ -51,12 +97,14 @@ def download_file_from_supabase(
     Returns the local file path.
     """
     try:
-        # Download file content as bytes
-        data = client.storage.from_(bucket_name).download(file_path)
-        
-        # Write to local file
-        with open(local_destination, 'wb') as f:
-            f.write(data)
+        # Stream the object straight to disk via the storage REST endpoint rather than
+        # holding the whole file in memory as bytes first
+        url = f"{client.supabase_url}/storage/v1/object/{bucket_name}/{file_path}"
+        with _get_http_client().stream("GET", url, headers=_supabase_auth_headers(client)) as resp:
+            resp.raise_for_status()
+            with open(local_destination, 'wb') as f:
+                for chunk in resp.iter_bytes(chunk_size=1 << 20):
+                    f.write(chunk)
         
         print(f"✅ Downloaded: {file_path} from bucket '{bucket_name}' to {local_destination}")
         return local_destination
@@ -64,27 +112,91 @@ def download_file_from_supabase(
         raise RuntimeError(f"Failed to download file from Supabase: {e}")
 
 
+# Supabase recommends resumable (TUS) uploads above 6 MB, sent in 6 MiB chunks
+RESUMABLE_UPLOAD_THRESHOLD = 6 * 1024 * 1024
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+def _resumable_upload_endpoint(supabase_url: str) -> str:
+    """
+    TUS endpoint for a project. Hosted projects use the direct storage hostname
+    (https://<project>.storage.supabase.co), which is what Supabase recommends.
+    """
+    base = supabase_url.rstrip("/")
+    if base.endswith(".supabase.co") and ".storage." not in base:
+        base = base[:-len(".supabase.co")] + ".storage.supabase.co"
+    return f"{base}/storage/v1/upload/resumable"
+
+
+def _upload_resumable(
+    client,
+    bucket_name: str,
+    local_file_path: str,
+    destination_path: str,
+    content_type: str,
+    upsert: bool = False
+) -> bool:
+    """
+    Upload a large file with the TUS protocol: fixed-size chunks, never the whole
+    file in memory, and interrupted uploads can resume.
+    Returns False without uploading if tuspy isn't installed.
+    """
+    try:
+        from tusclient import client as tus_client
+    except ImportError:
+        return False
+
+    tus = tus_client.TusClient(
+        _resumable_upload_endpoint(client.supabase_url),
+        headers={**_supabase_auth_headers(client), "x-upsert": "true" if upsert else "false"}
+    )
+    uploader = tus.uploader(
+        file_path=local_file_path,
+        chunk_size=RESUMABLE_CHUNK_SIZE,
+        metadata={
+            "bucketName": bucket_name,
+            "objectName": destination_path,
+            "contentType": content_type,
+        }
+    )
+    uploader.upload()
+    return True
+
+
 def upload_file_to_supabase(
     client,
     bucket_name: str,
     local_file_path: str,
     destination_path: str,
-    content_type: str = "text/csv"
+    content_type: str = "text/csv",
+    upsert: bool = False
 ) -> str:
     """
     Upload a local file to Supabase Storage.
+    Set upsert=True only when the destination may already exist; a plain upload skips
+    the server-side existence check.
+    Files over RESUMABLE_UPLOAD_THRESHOLD go through the TUS resumable endpoint in
+    6 MiB chunks (Supabase's recommended path for large files) when tuspy is installed;
+    otherwise, and for smaller files, the file is streamed from the open handle in a
+    single request.
     Returns the public URL or path.
     """
     try:
-        with open(local_file_path, 'rb') as f:
-            file_data = f.read()
-        
-        # Upload file
-        response = client.storage.from_(bucket_name).upload(
-            path=destination_path,
-            file=file_data,
-            file_options={"content-type": content_type, "upsert": "true"}
+        uploaded = os.path.getsize(local_file_path) > RESUMABLE_UPLOAD_THRESHOLD and _upload_resumable(
+            client, bucket_name, local_file_path, destination_path, content_type, upsert
         )
+        if not uploaded:
+            with open(local_file_path, 'rb') as f:
+                response = _get_http_client().post(
+                    f"{client.supabase_url}/storage/v1/object/{bucket_name}/{destination_path}",
+                    content=f,
+                    headers={
+                        **_supabase_auth_headers(client),
+                        "Content-Type": content_type,
+                        "x-upsert": "true" if upsert else "false",
+                    }
+                )
+                response.raise_for_status()
         
         print(f"✅ Uploaded: {local_file_path} to bucket '{bucket_name}' at {destination_path}")
         return destination_path
@@ -99,9 +211,27 @@ def insert_record_to_table(
 ):
     """
     Insert a record into a Supabase table (optional metadata tracking).
+    Posts straight to the PostgREST endpoint with an orjson-encoded body (stdlib
+    json if orjson isn't installed), skipping supabase-py's query builder.
     """
     try:
-        result = client.table(table_name).insert(record).execute()
+        try:
+            import orjson
+            body = orjson.dumps(record)
+        except ImportError:
+            import json
+            body = json.dumps(record).encode("utf-8")
+
+        result = _get_http_client().post(
+            f"{client.supabase_url}/rest/v1/{table_name}",
+            content=body,
+            headers={
+                **_supabase_auth_headers(client),
+                "Content-Type": "application/json",
+                "Prefer": "return=minimal",
+            }
+        )
+        result.raise_for_status()
         print(f"✅ Inserted record to table '{table_name}'")
         return result
     except Exception as e:
@@ -111,59 +241,129 @@ def insert_record_to_table(
 
 # --- Sentence splitting helpers ------------------------------------------------
 
-def split_sentences(text: str) -> List[str]:
+def split_sentences(text: str, fast: bool = False) -> List[str]:
     """
-    Try spaCy if installed with an English model; otherwise fall back to a simple splitter.
+    Shared spaCy/punctuation splitter from inference_utils (so the sentences match the
+    relevance CSV). fast=True skips spaCy and goes straight to the compiled punctuation scanner.
     """
-    text = (text or "").strip()
-    if not text:
-        return []
+    if fast:
+        text = (text or "").strip()
+        return naive_sentence_split(text, fast=True) if text else []
+    return split_sentences_shared(text, fallback=naive_sentence_split)
 
-    # Try spaCy
-    try:
-        import spacy
-        try:
-            nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            # If the small English model isn't present, try the transformer name if user has it.
-            # Otherwise, fall back.
-            return naive_sentence_split(text)
-        doc = nlp(text)
-        sents = [s.text.strip() for s in doc.sents if s.text.strip()]
-        if sents:
-            return sents
-    except Exception:
-        pass
 
-    # Fallback
-    return naive_sentence_split(text)
+# Above this many characters (ASCII only) the naive splitter switches to the Numba byte scanner
+FAST_SPLIT_MIN_CHARS = 1_000_000
+
+try:
+    from numba import njit
+
+    @njit(cache=True)
+    def _sentence_spans(buf):
+        """
+        Scan UTF-8 bytes for ., ! or ? followed by whitespace and return (start, end)
+        byte offsets of each piece, matching SENT_RE.split on ASCII whitespace.
+        """
+        n = buf.shape[0]
+        # Every split consumes at least two bytes, so n // 2 + 1 spans is an upper bound
+        spans = np.empty((n // 2 + 1, 2), dtype=np.int32)
+        k = 0
+        start = 0
+        i = 0
+        while i < n - 1:
+            c = buf[i]
+            nxt = buf[i + 1]
+            if (c == 46 or c == 33 or c == 63) and (nxt == 32 or (nxt >= 9 and nxt <= 13)):
+                spans[k, 0] = start
+                spans[k, 1] = i + 1
+                k += 1
+                i += 1
+                while i < n and (buf[i] == 32 or (buf[i] >= 9 and buf[i] <= 13)):
+                    i += 1
+                start = i
+            else:
+                i += 1
+        if start < n:
+            spans[k, 0] = start
+            spans[k, 1] = n
+            k += 1
+        return spans[:k]
+except ImportError:
+    _sentence_spans = None
+
+
+def _fast_sentence_split(text: str) -> List[str]:
+    buf = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    spans = _sentence_spans(buf)
+    if len(buf) != len(text):
+        # Map byte offsets to str offsets by counting UTF-8 lead bytes (anything but 10xxxxxx)
+        char_at = np.zeros(len(buf) + 1, dtype=np.int32)
+        np.cumsum((buf & 0xC0) != 0x80, out=char_at[1:])
+        spans = char_at[spans]
+    pieces = [text[s:e] for s, e in zip(spans[:, 0].tolist(), spans[:, 1].tolist())]
+    if len(buf) == len(text):
+        # Pure ASCII: the scanner already skipped every whitespace run, so the slices
+        # come out stripped and non-empty
+        return pieces
+    return [p for p in (p.strip() for p in pieces) if p]
+
+
+def split_sentences_mapped(transcript_path: str) -> List[str]:
+    """
+    Fast-split a transcript file by scanning its memory-mapped bytes directly, so the
+    whole transcript is never decoded into one str; only the sentences are.
+    Same output as split_sentences(read_text_input(path), fast=True).
+    """
+    with open(transcript_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buf = np.frombuffer(mm, dtype=np.uint8)
+            spans = _sentence_spans(buf)
+            # Release the buffer export before the map is closed
+            del buf
+            # Spans only ever cut at ASCII bytes, so every slice is valid UTF-8
+            pieces = [
+                mm[s:e].decode("utf-8").strip()
+                for s, e in zip(spans[:, 0].tolist(), spans[:, 1].tolist())
+            ]
+    return [
+        p.replace("\r\n", "\n").replace("\r", "\n") if "\r" in p else p
+        for p in pieces if p
+    ]
 
 
-def naive_sentence_split(text: str) -> List[str]:
+def naive_sentence_split(text: str, fast: bool = False) -> List[str]:
     """
     Very simple sentence splitter on punctuation. Keeps it robust for quick use.
+    Very large ASCII inputs (or fast=True) use a Numba-compiled byte scanner when numba
+    is installed; otherwise the regex below.
     """
-    import re
-    # Split on ., !, ? followed by space/newline, keep abbreviations somewhat intact
-    # This is not perfect but avoids extra dependencies.
-    pieces = re.split(r"(?<=[.!?])\s+", text.strip())
-    # Clean and drop empties
-    return [p.strip() for p in pieces if p.strip()]
+    text = text.strip()
+    use_fast = fast or (len(text) > FAST_SPLIT_MIN_CHARS and text.isascii())
+    if use_fast and _sentence_spans is not None and len(text) < 2**31:
+        return _fast_sentence_split(text)
+    return regex_sentence_split(text)
 
 
 # --- HF inference --------------------------------------------------------------
 
-def load_classifier(model_name: str, hf_token: Optional[str], device: Optional[int], batch_size: int):
-    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+def load_classifier(
+    model_name: str,
+    hf_token: Optional[str],
+    device: Optional[int],
+    batch_size: int,
+    compile_model: bool = False,
+    backend: str = "pt",
+    int8: bool = False
+):
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
     if hf_token:
         # Optional login (for gated/private models). If not needed, skip.
         from huggingface_hub import login
         login(token=hf_token)
 
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForSequenceClassification.from_pretrained(model_name)
-
     # device: -1 = CPU, 0 = first GPU
     # If user passed None, auto-detect GPU if available
     if device is None:
@@ -173,38 +373,83 @@ def load_classifier(model_name: str, hf_token: Optional[str], device: Optional[i
         except Exception:
             device = -1
 
-    clf = pipeline(
-        "text-classification",
-        model=model,
-        tokenizer=tokenizer,
-        framework="pt",
-        device=device,
-        truncation=True
-    )
-    return clf, model
+    # use_fast: the Rust tokenizer batch-encodes a whole list in one call
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    if backend == "onnx":
+        if int8:
+            print("⚠️  --int8 applies to the PyTorch backend; loading the ONNX model unquantized")
+        return tokenizer, load_onnx_model(model_name, device)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    if int8 and device < 0:
+        # Dynamic int8 Linear layers: weights quantized once, activations per batch.
+        # CPU inference is memory-bandwidth bound, and int8 matmuls use VNNI where available.
+        import torch
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif int8:
+        print("⚠️  --int8 only applies to CPU inference; running the GPU model in half precision instead")
+
+    if device >= 0:
+        # Half precision on GPU: the forward pass is bandwidth-bound, so halving the
+        # weight/activation bytes roughly doubles throughput. bf16 where supported.
+        import torch
+        dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        model.to(device=device, dtype=dtype)
+
+    if compile_model:
+        # Fuse ops with Inductor; "reduce-overhead" also captures CUDA graphs on GPU.
+        # First batches of each new shape pay the compile cost, hence opt-in.
+        import torch
+        mode = "reduce-overhead" if device >= 0 else "default"
+        model = torch.compile(model, mode=mode, fullgraph=False)
+
+    return tokenizer, model
 
 
 def run_inference(
-    clf,
+    tokenizer,
+    model,
     sentences: List[str],
     max_length: int = 512,
     batch_size: int = 32
 ) -> List[dict]:
     """
-    Batched inference over sentences. Returns list of dicts with 'label' and 'score'.
+    Batched inference over sentences. Returns list of dicts with 'label' and 'score',
+    in the same order as `sentences`.
+    Calls the model directly (no HF pipeline), so there is no per-example
+    pre/post-processing in Python.
     """
-    results: List[dict] = []
     if not sentences:
-        return results
+        return []
 
-    for i in range(0, len(sentences), batch_size):
-        batch = sentences[i:i+batch_size]
-        out = clf(batch, truncation=True, max_length=max_length)
-        # pipeline returns a single dict for single string, or list for list
-        if isinstance(out, dict):
-            results.append(out)
-        else:
-            results.extend(out)
+    import torch
+
+    # Tokenize and truncate everything once with the fast tokenizer, then batch
+    # sentences of similar token length together so each batch pads to roughly
+    # its own length instead of the longest sentence in a random mix.
+    encoded = tokenizer(sentences, truncation=True, max_length=max_length)
+    input_ids = encoded["input_ids"]
+    order = sorted(range(len(sentences)), key=lambda i: len(input_ids[i]))
+
+    # Same label naming as the text-classification pipeline
+    id2label = model.config.id2label
+
+    results: List[dict] = [None] * len(sentences)
+    with torch.inference_mode():
+        for i in range(0, len(order), batch_size):
+            idxs = order[i:i+batch_size]
+            enc = tokenizer.pad(
+                {key: [encoded[key][j] for j in idxs] for key in encoded.keys()},
+                return_tensors="pt"
+            ).to(model.device)
+            logits = model(**enc).logits
+            # Softmax in fp32 even when the model runs in half precision
+            scores, label_ids = logits.float().softmax(-1).max(-1)
+            # Scatter back to the original sentence positions
+            for j, score, label_id in zip(idxs, scores.cpu().tolist(), label_ids.cpu().tolist()):
+                results[j] = {"label": id2label.get(label_id, f"LABEL_{label_id}"), "score": score}
     return results
 
 
@@ -231,6 +476,20 @@ def resolve_label_name(raw_label: str, id2label: Optional[dict]) -> Tuple[str, i
     return readable, (numeric_id if numeric_id is not None else -1)
 
 
+def build_label_map(id2label: Optional[dict]) -> dict:
+    """
+    Precompute {raw_label: (readable_label, numeric_id)} for every label the model
+    can emit, so rows don't re-parse 'LABEL_X' strings one sentence at a time.
+    Covers both the 'LABEL_X' form and the id2label names themselves (which is what
+    run_inference emits when the config has readable names).
+    """
+    label_map = {}
+    for label_id, name in (id2label or {}).items():
+        label_map[f"LABEL_{label_id}"] = (name, label_id)
+        label_map[name] = (name, label_id)
+    return label_map
+
+
 def specificity_0_to_1(label_id: int, score: float) -> float:
     """
     Map model (3 classes) to a continuous specificity in [0, 1].
@@ -259,18 +518,28 @@ def specificity_minus1_to_1(label_id: int, score: float) -> float:
     return max(-1.0, min(1.0, val))
 
 
-def moving_average(values: List[float], window: int) -> List[Optional[float]]:
+# Lookup tables for the vectorized mappings below. Index 3 holds the base used for
+# unknown labels (label_id -1 or out of range), matching the scalar functions' defaults.
+BASE01 = np.array([0.00, 0.34, 0.67, 0.00])
+BASEM1 = np.array([-1.00, -0.33, 0.34, -1.00])
+
+
+def _base_index(label_ids: np.ndarray) -> np.ndarray:
+    return np.where((label_ids >= 0) & (label_ids <= 2), label_ids, 3)
+
+
+def specificity_0_to_1_array(label_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
     """
-    Simple trailing moving average; first window-1 entries are None.
+    Vectorized specificity_0_to_1 over arrays of label ids and scores.
     """
-    if window <= 1 or not values:
-        return [None for _ in values]
-    import numpy as np
-    v = np.array(values, dtype=float)
-    kernel = np.ones(window, dtype=float) / float(window)
-    sm = np.convolve(v, kernel, mode="valid").tolist()
-    pad = [None] * (window - 1)
-    return pad + sm
+    return np.clip(BASE01[_base_index(label_ids)] + scores * 0.33, 0.0, 1.0)
+
+
+def specificity_minus1_to_1_array(label_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    Vectorized specificity_minus1_to_1 over arrays of label ids and scores.
+    """
+    return np.clip(BASEM1[_base_index(label_ids)] + scores * 0.66, -1.0, 1.0)
 
 
 # --- I/O helpers ---------------------------------------------------------------
@@ -281,10 +550,19 @@ def read_text_input(
 ) -> str:
     """
     Read transcript from a file, or (optionally) stdin if no path provided.
+    Files are decoded straight from a read-only memory map, so there is no separate
+    bytes buffer alongside the decoded str.
     """
     if transcript_path:
-        with open(transcript_path, "r", encoding="utf-8") as f:
-            return f.read()
+        with open(transcript_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, "utf-8")
+        # Same newline translation as opening the file in text mode
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
 
     if stdin_fallback and not sys.stdin.isatty():
         return sys.stdin.read()
@@ -292,26 +570,310 @@ def read_text_input(
     raise ValueError("No transcript provided. Pass --input /path/to/file.txt or pipe text via stdin with --stdin.")
 
 
-def write_csv(
-    rows: List[dict],
-    out_path: str
+CSV_FIELDNAMES = [
+    "sentence_index",
+    "sentence_text",
+    "raw_label",         # e.g., LABEL_0
+    "label_id",          # 0/1/2 if known
+    "label_name",        # human-readable if available
+    "score",             # model confidence for predicted class
+    "specificity_0_1",   # normalized [0,1]
+    "specificity_-1_1",  # normalized [-1,1]
+    "ma_specificity_0_1" # moving average over specificity_0_1 (optional)
+]
+
+# Rows are scored and written this many at a time, so only one chunk of row
+# data exists in memory at once
+ROW_CHUNK_SIZE = 4096
+
+
+def specificity_rows(
+    start_index: int,
+    sentences: List[str],
+    results: List[dict],
+    label_map: dict,
+    window: int,
+    ma_history: deque
 ):
-    fieldnames = [
-        "sentence_index",
-        "sentence_text",
-        "raw_label",         # e.g., LABEL_0
-        "label_id",          # 0/1/2 if known
-        "label_name",        # human-readable if available
-        "score",             # model confidence for predicted class
-        "specificity_0_1",   # normalized [0,1]
-        "specificity_-1_1",  # normalized [-1,1]
-        "ma_specificity_0_1" # moving average over specificity_0_1 (optional)
-    ]
-    with open(out_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
+    """
+    CSV rows (in CSV_FIELDNAMES order) for one chunk of classified sentences.
+    Label ids and scores go into arrays once, both specificity mappings are
+    computed over the whole chunk at once, and floats are formatted to strings here.
+    """
+    # A None result is a sentence skipped by --min-words: label_id -1 and empty scores
+    raw_labels = [res.get("label", "LABEL_0") if res is not None else "" for res in results]
+    resolved = [label_map.get(raw_label) or resolve_label_name(raw_label, None) for raw_label in raw_labels]
+    label_ids = np.fromiter((label_id for _, label_id in resolved), dtype=np.int64, count=len(resolved))
+    scores = np.fromiter(
+        (res.get("score", 0.0) if res is not None else np.nan for res in results),
+        dtype=np.float64, count=len(results)
+    )
+
+    s01 = specificity_0_to_1_array(label_ids, scores)
+    sm1 = specificity_minus1_to_1_array(label_ids, scores)
+    ma = moving_average_step(s01.tolist(), window, ma_history)
+
+    return zip(
+        range(start_index, start_index + len(sentences)),
+        sentences,
+        raw_labels,
+        label_ids.tolist(),
+        [readable_label for readable_label, _ in resolved],
+        fmt6(scores.tolist()),
+        fmt6(s01.tolist()),
+        fmt6(sm1.tolist()),
+        fmt6(ma)
+    )
+
+
+class Classifier:
+    """
+    A loaded specificity model plus the per-transcript classify/write steps.
+    Loading (hub login, tokenizer, weights) happens once; one instance can then
+    process any number of transcripts (see --serve).
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        model,
+        max_length: int = 512,
+        batch_size: int = 32,
+        min_words: int = 3,
+        dedup: bool = True
+    ):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.min_words = min_words
+        self.dedup = dedup
+
+        # Prepare id2label (if available) for nicer names
+        id2label = None
+        try:
+            # model.config.id2label maps int -> str (e.g., {0: "Not Specific", 1: "Somewhat Specific", 2: "Very Specific"})
+            id2label = getattr(model.config, "id2label", None)
+            # Ensure keys are int
+            if isinstance(id2label, dict):
+                id2label = {int(k): v for k, v in id2label.items()}
+        except Exception:
+            id2label = None
+        self.label_map = build_label_map(id2label)
+
+    @classmethod
+    def load(
+        cls,
+        model_name: str,
+        hf_token: Optional[str],
+        device: Optional[int],
+        batch_size: int = 32,
+        compile_model: bool = False,
+        backend: str = "pt",
+        int8: bool = False,
+        **kwargs
+    ) -> "Classifier":
+        tokenizer, model = load_classifier(
+            model_name, hf_token, device, batch_size, compile_model, backend, int8
+        )
+        return cls(tokenizer, model, batch_size=batch_size, **kwargs)
+
+    def classify(self, sentences: List[str]) -> List[Optional[dict]]:
+        """
+        Results in sentence order: {'label', 'score'} per sentence, or None for
+        sentences skipped by min_words.
+        """
+        # Sentences under min_words ("Yes.", "Thank you.") carry no signal; they keep
+        # their row but skip the model (result None -> label_id -1, empty scores)
+        results: List[Optional[dict]] = [None] * len(sentences)
+        eligible = [i for i, sent in enumerate(sentences) if len(sent.split()) >= self.min_words]
+        if len(eligible) < len(sentences):
+            print(f"   Skipping {len(sentences) - len(eligible)} sentences under {self.min_words} words")
+
+        # Repeated sentences ("Next question.", "Thank you.") only need one forward pass;
+        # the result is shared by every occurrence
+        eligible_texts = [sentences[i] for i in eligible]
+        to_classify = list(dict.fromkeys(eligible_texts)) if self.dedup else eligible_texts
+        if len(to_classify) < len(eligible_texts):
+            print(f"   {len(eligible_texts) - len(to_classify)} duplicate sentences reuse earlier results")
+
+        # Infer
+        print(f"🔍 Running inference...")
+        unique_results = run_inference(
+            self.tokenizer, self.model, to_classify,
+            max_length=self.max_length, batch_size=self.batch_size
+        )
+        if self.dedup:
+            result_by_sentence = dict(zip(to_classify, unique_results))
+            for i, sent in zip(eligible, eligible_texts):
+                results[i] = result_by_sentence[sent]
+        else:
+            for i, res in zip(eligible, unique_results):
+                results[i] = res
+        return results
+
+    def write_csv(
+        self,
+        sentences: List[str],
+        results: List[Optional[dict]],
+        output_path: str,
+        ma_window: int
+    ):
+        # Score and write rows chunk by chunk instead of building every row up front.
+        # The moving average (optional) carries across chunks via ma_history.
+        window = max(0, int(ma_window or 0))
+        if window >= 2 and sentences:
+            print(f"📊 Computing moving average (window={window})...")
+        ma_history = deque(maxlen=max(window - 1, 0))
+
+        with open(output_path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDNAMES)
+            for start in range(0, len(sentences), ROW_CHUNK_SIZE):
+                end = start + ROW_CHUNK_SIZE
+                writer.writerows(specificity_rows(
+                    start, sentences[start:end], results[start:end], self.label_map, window, ma_history
+                ))
+        print(f"✅ Wrote {len(sentences)} rows to: {output_path}")
+
+
+def process_transcript(
+    args,
+    supabase_client,
+    get_classifier,
+    input_file: Optional[str] = None,
+    output_file: Optional[str] = None
+) -> dict:
+    """
+    One transcript end to end: download (if input_file), split, classify, write
+    args.output and upload it (if Supabase is configured).
+    get_classifier() returns the Classifier; it is only called once the sentences
+    are ready, so a one-shot run can keep loading the model during the download.
+    Returns {"output_file", "sentence_count"}.
+    """
+    use_supabase = supabase_client is not None
+
+    # Download input from Supabase if specified
+    local_input_path = args.input
+    if use_supabase and input_file:
+        # Create temp file for download
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as tmp:
+            local_input_path = tmp.name
+
+    try:
+        if use_supabase and input_file:
+            download_file_from_supabase(
+                supabase_client,
+                args.input_bucket,
+                input_file,
+                local_input_path
+            )
+
+        if args.sentences_per_line:
+            text = read_text_input(local_input_path, stdin_fallback=args.stdin)
+            print(f"📝 Using one sentence per line...")
+            sentences = [ln.strip() for ln in text.splitlines() if ln.strip()]
+        elif args.fast_split and _sentence_spans is not None and local_input_path \
+                and os.path.getsize(local_input_path) < 2**31:
+            # Split straight from the memory-mapped file, never holding the full text
+            print(f"📝 Splitting text into sentences...")
+            sentences = split_sentences_mapped(local_input_path)
+        else:
+            # Read transcript text
+            text = read_text_input(local_input_path, stdin_fallback=args.stdin)
+
+            # Split to sentences
+            print(f"📝 Splitting text into sentences...")
+            sentences = split_sentences(text, fast=args.fast_split)
+        print(f"   Found {len(sentences)} sentences")
+    finally:
+        # Cleanup temp file if used
+        if use_supabase and input_file and local_input_path != args.input:
+            try:
+                os.unlink(local_input_path)
+            except Exception:
+                pass
+
+    # Wait for the classifier
+    classifier = get_classifier()
+    results = classifier.classify(sentences)
+    classifier.write_csv(sentences, results, args.output, args.ma_window)
+
+    # Upload to Supabase if enabled
+    output_path = None
+    if use_supabase:
+        # Generate output filename if not provided
+        output_path = output_file
+        if not output_path:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_name = os.path.splitext(os.path.basename(input_file or "transcript"))[0]
+            output_path = f"{base_name}_specificity_{timestamp}.csv"
+        
+        upload_file_to_supabase(
+            supabase_client,
+            args.output_bucket,
+            args.output,
+            output_path,
+            content_type="text/csv",
+            # Auto-generated names are timestamped and unique; only a caller-chosen path can collide
+            upsert=bool(output_file)
+        )
+        
+        # Track metadata if requested
+        if args.track_metadata:
+            metadata = {
+                "input_file": input_file,
+                "output_file": output_path,
+                "model": args.model,
+                "sentence_count": len(sentences),
+                "processed_at": datetime.now().isoformat(),
+                "status": "completed"
+            }
+            insert_record_to_table(supabase_client, args.metadata_table, metadata)
+
+    return {"output_file": output_path, "sentence_count": len(sentences)}
+
+
+def serve(args, supabase_client, classifier: Classifier, results_out):
+    """
+    Persistent worker: the model stays loaded while jobs are read from stdin, one
+    JSON object per line: {"input_file": "...", "output_file": "..." (optional)}.
+    Each job is downloaded from / uploaded to Supabase like a one-shot run, and one
+    JSON status line per job is written to `results_out`; progress output goes to
+    stdout, which main() points at stderr in serve mode.
+    Failed jobs are recorded in args.metadata_table too when --track-metadata is set.
+    """
+    print("🟢 Serving: one JSON job per line on stdin (Ctrl-D to stop)", flush=True)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        input_file = output_file = None
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("job must be a JSON object")
+            input_file, output_file = job.get("input_file"), job.get("output_file")
+            if not input_file:
+                raise ValueError("job has no input_file")
+            outcome = process_transcript(
+                args, supabase_client, lambda: classifier,
+                input_file=input_file, output_file=output_file
+            )
+            status = {"input_file": input_file, "status": "completed", **outcome}
+        except Exception as e:
+            status = {"input_file": input_file, "status": "failed", "error": str(e)}
+            if args.track_metadata:
+                # Same columns as a completed row, so it fits the existing table
+                insert_record_to_table(supabase_client, args.metadata_table, {
+                    "input_file": input_file,
+                    "output_file": output_file,
+                    "model": args.model,
+                    "sentence_count": None,
+                    "processed_at": datetime.now().isoformat(),
+                    "status": "failed"
+                })
+        print(json.dumps(status), file=results_out, flush=True)
 
 
 # --- Main ---------------------------------------------------------------------
@@ -353,10 +915,33 @@ def main():
     parser.add_argument("--batch-size", type=int, default=32, help="Batch size for inference (default: 32)")
     parser.add_argument("--max-length", type=int, default=512, help="Max tokens per sentence (default: 512)")
     parser.add_argument("--device", type=int, default=None,
-                        help="Device for transformers pipeline: -1=CPU, 0=GPU0. Default: auto-detect.")
+                        help="Device for inference: -1=CPU, 0=GPU0. Default: auto-detect.")
+    parser.add_argument("--backend", type=str, choices=["pt", "onnx"], default="pt",
+                        help="Inference backend: pt=PyTorch, onnx=ONNX Runtime via optimum (default: pt)")
+    parser.add_argument("--int8", action="store_true",
+                        help="Dynamic int8 quantization of the Linear layers (PyTorch backend on CPU only)")
+    parser.add_argument("--compile", action="store_true",
+                        help="torch.compile the model (faster steady state, slower first batches)")
+    parser.add_argument("--sentences-per-line", action="store_true",
+                        help="Treat each non-empty input line as one sentence and skip sentence splitting. "
+                             "Pass it to text_insights_relevant.py too so both CSVs have the same sentences.")
+    parser.add_argument("--fast-split", action="store_true",
+                        help="Skip spaCy and split on punctuation with the Numba byte scanner (for huge transcripts)")
+    parser.add_argument("--min-words", type=int, default=3,
+                        help="Skip inference for sentences shorter than this many words; they are written "
+                             "with label_id -1 and empty scores (default: 3; 0 keeps all)")
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction, default=True,
+                        help="Classify each distinct sentence once and reuse the result for repeats "
+                             "(default: on; --no-dedup to disable)")
     parser.add_argument("--ma-window", type=int, default=20,
                         help="Moving average window over specificity_0_1 (default: 20; set 0/1 to disable).")
     
+    # Persistent worker mode
+    parser.add_argument("--serve", action="store_true",
+                        help="Load the model once, then process jobs read from stdin as JSON lines "
+                             "({\"input_file\": ..., \"output_file\": ...}) until EOF; one JSON result "
+                             "line per job on stdout, progress on stderr")
+    
     # Metadata tracking (optional)
     parser.add_argument("--track-metadata", action="store_true",
                         help="Insert processing metadata into a Supabase table (requires 'processing_jobs' table)")
@@ -365,6 +950,16 @@ def main():
 
     args = parser.parse_args()
 
+    # In serve mode stdout carries only the per-job JSON result lines; every progress
+    # message (ours and the helpers') goes to stderr instead
+    results_out = sys.stdout
+    if args.serve:
+        sys.stdout = sys.stderr
+
+    if args.serve and not (args.supabase_url and args.supabase_key):
+        print("❌ Error: --serve requires Supabase credentials (jobs are read from and written to Supabase)")
+        sys.exit(1)
+
     # Validate Supabase usage
     if args.input_file and not (args.supabase_url and args.supabase_key):
         print("❌ Error: --input-file requires Supabase credentials")
@@ -383,124 +978,41 @@ def main():
         supabase_client = get_supabase_client(args.supabase_url, args.supabase_key)
         print(f"✅ Connected to Supabase")
 
-    # Download input from Supabase if specified
-    local_input_path = args.input
-    if use_supabase and args.input_file:
-        # Create temp file for download
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as tmp:
-            temp_input_path = tmp.name
-        
-        download_file_from_supabase(
-            supabase_client,
-            args.input_bucket,
-            args.input_file,
-            temp_input_path
-        )
-        local_input_path = temp_input_path
-
-    # Read transcript text
-    text = read_text_input(local_input_path, stdin_fallback=args.stdin)
+    classifier_kwargs = dict(
+        max_length=args.max_length, min_words=args.min_words, dedup=args.dedup
+    )
 
-    # Split to sentences
-    print(f"📝 Splitting text into sentences...")
-    sentences = split_sentences(text)
-    print(f"   Found {len(sentences)} sentences")
+    if args.serve:
+        print(f"🤖 Loading model: {args.model}")
+        classifier = Classifier.load(
+            args.model, args.hf_token, args.device, args.batch_size, args.compile,
+            args.backend, args.int8, **classifier_kwargs
+        )
+        serve(args, supabase_client, classifier, results_out)
+        close_http_client()
+        return
 
-    # Load classifier
+    # Start loading the classifier in the background before the download, so the
+    # network-bound download overlaps with reading model weights
     print(f"🤖 Loading model: {args.model}")
-    clf, model = load_classifier(args.model, args.hf_token, args.device, args.batch_size)
-
-    # Infer
-    print(f"🔍 Running inference...")
-    results = run_inference(clf, sentences, max_length=args.max_length, batch_size=args.batch_size)
-
-    # Prepare id2label (if available) for nicer names
-    id2label = None
-    try:
-        # model.config.id2label maps int -> str (e.g., {0: "Not Specific", 1: "Somewhat Specific", 2: "Very Specific"})
-        id2label = getattr(model.config, "id2label", None)
-        # Ensure keys are int
-        if isinstance(id2label, dict):
-            id2label = {int(k): v for k, v in id2label.items()}
-    except Exception:
-        id2label = None
-
-    # Build rows
-    rows = []
-    spec01_series = []
-
-    for idx, (sent, res) in enumerate(zip(sentences, results)):
-        raw_label = res.get("label", "LABEL_0")
-        score = float(res.get("score", 0.0))
-        readable_label, label_id = resolve_label_name(raw_label, id2label)
-
-        s01 = specificity_0_to_1(label_id, score)
-        sm1 = specificity_minus1_to_1(label_id, score)
-
-        spec01_series.append(s01)
-
-        rows.append({
-            "sentence_index": idx,
-            "sentence_text": sent,
-            "raw_label": raw_label,
-            "label_id": label_id,
-            "label_name": readable_label,
-            "score": round(score, 6),
-            "specificity_0_1": round(s01, 6),
-            "specificity_-1_1": round(sm1, 6),
-            "ma_specificity_0_1": None  # filled after we compute MA
-        })
-
-    # Moving average (optional)
-    window = max(0, int(args.ma_window or 0))
-    if window >= 2 and spec01_series:
-        print(f"📊 Computing moving average (window={window})...")
-        ma = moving_average(spec01_series, window)
-        for r, ma_val in zip(rows, ma):
-            r["ma_specificity_0_1"] = None if ma_val is None else round(float(ma_val), 6)
-
-    # Write CSV locally
-    write_csv(rows, args.output)
-    print(f"✅ Wrote {len(rows)} rows to: {args.output}")
-
-    # Upload to Supabase if enabled
-    if use_supabase:
-        # Generate output filename if not provided
-        output_path = args.output_file
-        if not output_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_name = os.path.splitext(os.path.basename(args.input_file or "transcript"))[0]
-            output_path = f"{base_name}_specificity_{timestamp}.csv"
-        
-        upload_file_to_supabase(
-            supabase_client,
-            args.output_bucket,
-            args.output,
-            output_path,
-            content_type="text/csv"
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        fut_model = pool.submit(
+            Classifier.load, args.model, args.hf_token, args.device, args.batch_size, args.compile,
+            args.backend, args.int8, **classifier_kwargs
         )
-        
-        # Track metadata if requested
-        if args.track_metadata:
-            metadata = {
-                "input_file": args.input_file,
-                "output_file": output_path,
-                "model": args.model,
-                "sentence_count": len(sentences),
-                "processed_at": datetime.now().isoformat(),
-                "status": "completed"
-            }
-            insert_record_to_table(supabase_client, args.metadata_table, metadata)
-
-    # Cleanup temp file if used
-    if use_supabase and args.input_file and local_input_path != args.input:
         try:
-            os.unlink(local_input_path)
-        except Exception:
-            pass
-
+            process_transcript(
+                args, supabase_client, fut_model.result,
+                input_file=args.input_file, output_file=args.output_file
+            )
+        except BaseException as e:
+            # Report right away; leaving the with block still waits for a load in progress
+            if not fut_model.cancel() and not fut_model.done():
+                print(f"❌ {type(e).__name__}: {e} (waiting for the model load to stop)", file=sys.stderr)
+            raise
+
+    close_http_client()
     print("\n🎉 Processing complete!")
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file